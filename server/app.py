@@ -2,8 +2,17 @@ import os
 import io
 import time
 import uuid
+import random
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import librosa
+import soundfile
 import torch
 from flask import Flask, request, jsonify
 from flask_cors import CORS
@@ -12,7 +21,7 @@ from google.cloud import speech
 from pydub import AudioSegment
 from g2p_en import G2p
 import nltk
-from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
+from transformers import AutoFeatureExtractor, AutoModelForAudioClassification, Wav2Vec2FeatureExtractor
 
 # --- NLTK SETUP ---
 try:
@@ -31,6 +40,19 @@ if not os.path.exists(CREDENTIALS_PATH):
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = CREDENTIALS_PATH
 
+# One Speech client (auth + gRPC channel) shared by all requests; it is thread-safe.
+# Created on first use so gRPC never opens a channel before a server process forks.
+_speech_client = None
+_speech_client_lock = threading.Lock()
+
+def get_speech_client():
+    global _speech_client
+    if _speech_client is None:
+        with _speech_client_lock:
+            if _speech_client is None:
+                _speech_client = speech.SpeechClient()
+    return _speech_client
+
 # --- WAV2VEC MODEL PATH ---
 # Prefer environment variable MODEL_PATH; fallback to repo-relative folder `server/final_stutter_wav2vec`
 MODEL_PATH = os.environ.get("MODEL_PATH")
@@ -46,11 +68,28 @@ if not os.path.exists(os.path.join(MODEL_PATH, "config.json")):
 
 # --- CONSTANTS & TUNING ---
 SAMPLE_RATE = 16000
+MAX_MODEL_SAMPLES = SAMPLE_RATE * 3  # Max 3 seconds context
 MAX_AUDIO_BYTES = 5 * 1024 * 1024  # 5MB
 ALLOWED_EXTENSIONS = {'wav', 'm4a', 'mp3'}
 SPEECH_PROB_MIN = float(os.environ.get('SPEECH_PROB_MIN', '0.35'))
 PITCHED_RATIO_MIN = float(os.environ.get('PITCHED_RATIO_MIN', '0.15'))
+SILENCE_PEAK = float(os.environ.get('SILENCE_PEAK', '0.005'))
 PROGRESSION_CONFIDENCE = 0.75
+QUANTIZE_INT8 = os.environ.get('QUANTIZE_INT8', '1') == '1'  # set 0 to run the fp32 weights
+TORCH_DEVICE = os.environ.get('TORCH_DEVICE', 'cpu')
+AUTOCAST_BF16 = os.environ.get('AUTOCAST_BF16', '0') == '1'
+TORCH_COMPILE = os.environ.get('TORCH_COMPILE', '0') == '1'
+TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', '1'))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '8'))
+MAX_BATCH_DELAY_MS = float(os.environ.get('MAX_BATCH_DELAY_MS', '10'))
+PREDICTION_CACHE_SIZE = 512
+G2P_CACHE_SIZE = 4096
+ANALYSIS_POOL_WORKERS = 4
+STT_CHUNK_BYTES = 16000  # 0.5s of 16kHz LINEAR16 per streaming message (API cap is 25KB)
+STT_STREAMING_MAX_SEC = 15
+STT_SYNC_MAX_SEC = 60  # recognize() rejects clips over 1 minute
+STT_TIMEOUT_SEC = float(os.environ.get('STT_TIMEOUT_SEC', '10'))
+STT_LONG_RUNNING_TIMEOUT_SEC = float(os.environ.get('STT_LONG_RUNNING_TIMEOUT_SEC', '120'))
 
 # --- FLASK SETUP ---
 app = Flask(__name__)
@@ -68,68 +107,329 @@ PHONEME_MAP = {
     'T': 't', 'TH': 'th', 'UH': 'u', 'UW': 'oo', 'V': 'v',
     'W': 'w', 'Y': 'y', 'Z': 'z', 'ZH': 'zh'
 }
+# g2p emits these between words; they're never phonemes
+PH_SKIP = frozenset((' ', "'"))
+# Every ARPABET token as g2p emits it, stress variants included ('AA1' -> 'a'),
+# so the request path is a single dict lookup per phoneme
+ARPABET_MAP = {**PHONEME_MAP, **{arpa + stress: kid for arpa, kid in PHONEME_MAP.items() for stress in '012'}}
+# Inverse: kid-friendly target -> every ARPABET token that maps to it ('a' -> AA*, AE*, EY*)
+KID_TO_ARPABET = {kid: frozenset(t for t, k in ARPABET_MAP.items() if k == kid) for kid in set(PHONEME_MAP.values())}
+
+# --- PRECOMPUTED PROMPT PHONEMES ---
+# Prompt vocabulary (generated by build_prompt_words.py), run through g2p once at
+# warm-up (see build_word2phoneme); words outside the table fall back to g2p
+PROMPT_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_words.txt")
+if not os.path.exists(PROMPT_WORDS_PATH):
+    raise ValueError(f"❌ {PROMPT_WORDS_PATH} not found. Run server/build_prompt_words.py")
+with open(PROMPT_WORDS_PATH, encoding='utf-8') as f:
+    PROMPT_WORDS = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+WORD2PHONEME = {}
 
 # --- LOAD MODELS (IMMEDIATE LOADING) ---
+# Scale out with server processes rather than intra-op threads: one OpenMP pool
+# per worker spanning every core just thrashes when requests run concurrently
+torch.set_num_threads(TORCH_NUM_THREADS)
+torch.set_num_interop_threads(1)
+
 print("📥 Loading Wav2Vec 2.0 Model...")
 try:
     # Feature Extractor handles audio processing (16kHz resampling, padding)
-    processor = AutoFeatureExtractor.from_pretrained(MODEL_PATH)
+    # local_files_only: MODEL_PATH is baked into the image, never resolve against the Hub
+    processor = AutoFeatureExtractor.from_pretrained(MODEL_PATH, local_files_only=True)
     # Audio Classification Model handles the prediction
-    model = AutoModelForAudioClassification.from_pretrained(MODEL_PATH)
+    model = AutoModelForAudioClassification.from_pretrained(MODEL_PATH, local_files_only=True)
+    model.eval()
+    
+    ON_GPU = TORCH_DEVICE.startswith('cuda')
+    if ON_GPU:
+        # Half-precision weights on GPU; dynamic int8 quantization is CPU-only
+        model = model.half().to(TORCH_DEVICE)
+        print(f"⚡ Wav2Vec running fp16 on {TORCH_DEVICE}")
+    elif QUANTIZE_INT8:
+        # Dynamic int8 weights for the Linear layers that dominate transformer FLOPs
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("⚡ Wav2Vec Linear layers quantized to int8")
     
-    # Optional: Move to GPU if available
-    # device = "cuda" if torch.cuda.is_available() else "cpu"
-    # model.to(device)
+    # bf16 autocast only pays off on CPUs with native bf16 (AVX-512 BF16 / AMX),
+    # and has nothing to convert once the Linear layers are int8
+    USE_BF16_AUTOCAST = AUTOCAST_BF16 and not ON_GPU and not QUANTIZE_INT8
+    INPUT_DTYPE = torch.float16 if ON_GPU else torch.float32
+    
+    if TORCH_COMPILE:
+        # Compiles lazily on the first forward (warm-up); dynamic shapes avoid a
+        # recompile for every new clip length
+        model = torch.compile(model, dynamic=True)
     
     print("✅ Wav2Vec 2.0 System Ready!")
 except Exception as e:
     print(f"❌ Critical Error Loading Model: {e}")
     raise e
 
+# --- DYNAMIC BATCHING ---
+class InferenceBatcher:
+    """
+    Micro-batches concurrent Wav2Vec requests into one forward pass.
+    Requests wait at most max_delay_ms for company before the batch runs.
+    """
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_delay_ms=MAX_BATCH_DELAY_MS):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, inputs):
+        """Queue processor output for one clip; blocks until (label, score) is ready."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((inputs, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # Started lazily so every server process owns its own worker thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='wav2vec-batcher', daemon=True)
+                self._worker.start()
+
+    @staticmethod
+    def _is_full_length(inputs):
+        try:
+            return inputs['input_values'].shape[-1] >= MAX_MODEL_SAMPLES
+        except Exception:
+            return False
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Shorter clips differ in length and never share a pass, and with nothing
+            # else queued the window would be pure latency; just take what's waiting
+            wait = self._is_full_length(batch[0][0]) and not self._queue.empty()
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if wait and remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if wait else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # The worker must outlive any bad batch, and no caller may be left waiting
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        # Padding would shift the mean-pooled logits, so only equal-length clips share a pass
+        groups = {}
+        for inputs, future in batch:
+            try:
+                length = inputs['input_values'].shape[-1]
+            except Exception as e:
+                # Malformed inputs fail only their own request
+                future.set_exception(e)
+                continue
+            groups.setdefault(length, []).append((inputs, future))
+
+        for items in groups.values():
+            try:
+                stacked = {}
+                for k in items[0][0].keys():
+                    v = torch.cat([inputs[k] for inputs, _ in items])
+                    stacked[k] = v.to(TORCH_DEVICE, INPUT_DTYPE) if v.is_floating_point() else v.to(TORCH_DEVICE)
+                with torch.inference_mode(), torch.autocast('cpu', dtype=torch.bfloat16, enabled=USE_BF16_AUTOCAST):
+                    logits = model(**stacked).logits
+                probs = torch.nn.functional.softmax(logits.float(), dim=-1)
+                scores, ids = torch.max(probs, dim=-1)
+                for (_, future), score, idx in zip(items, scores.tolist(), ids.tolist()):
+                    future.set_result((model.config.id2label[idx], score))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+inference_batcher = InferenceBatcher()
+
+# --- PREDICTION CACHE ---
+class PredictionCache:
+    """Thread-safe LRU of Wav2Vec (label, score) results keyed by upload digest."""
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+prediction_cache = PredictionCache()
+
+# Runs the slow independent per-request steps (Google STT, pitch tracking)
+# alongside Wav2Vec inference; they release the GIL in gRPC / C code.
+analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_POOL_WORKERS, thread_name_prefix='analysis')
+
 # --- HELPER FUNCTIONS ---
 
-def predict_file(filepath):
+def load_audio(data):
+    """
+    Decode upload bytes once (16kHz mono float32) so every analyzer shares it.
+    Returns: (audio_array, sample_rate)
     """
-    Manual prediction using Wav2Vec.
+    try:
+        audio, sr = soundfile.read(io.BytesIO(data), dtype='float32', always_2d=False)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+    except Exception:
+        # libsndfile can't read MP4/3GP containers (phone m4a); ffmpeg decodes them from a pipe
+        segment = AudioSegment.from_file(io.BytesIO(data)).set_channels(1)
+        audio = np.array(segment.get_array_of_samples(), dtype=np.float32)
+        audio /= float(1 << (8 * segment.sample_width - 1))
+        sr = segment.frame_rate
+
+    # Phone recordings are usually 16kHz already; only resample when they aren't.
+    # soxr_qq is plenty for a 16kHz classifier and about 2x cheaper than soxr_hq
+    if sr != SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=SAMPLE_RATE, res_type='soxr_qq')
+    return audio, SAMPLE_RATE
+
+def is_silent(audio):
+    """True when the whole clip peaks under SILENCE_PEAK, i.e. nothing worth running Wav2Vec or STT on."""
+    # max/-min instead of abs().max() avoids a full-size temporary
+    return audio.size == 0 or max(float(audio.max()), -float(audio.min())) < SILENCE_PEAK
+
+def audio_digest(data):
+    """Content hash of the raw upload, used as the prediction cache key."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def extract_features(audio):
+    """
+    Model inputs for one clip. For a Wav2Vec2FeatureExtractor this reproduces
+    processor(audio, truncation=True, max_length=MAX_MODEL_SAMPLES) directly in
+    numpy, skipping its per-call padding and BatchFeature conversion.
+    Returns: dict of (1, n) tensors.
+    """
+    if not isinstance(processor, Wav2Vec2FeatureExtractor):
+        return processor(audio, sampling_rate=SAMPLE_RATE, return_tensors="pt",
+                         padding=True, truncation=True, max_length=MAX_MODEL_SAMPLES)
+
+    x = np.asarray(audio[:MAX_MODEL_SAMPLES], dtype=np.float32)
+    if processor.do_normalize:
+        # Same expression as Wav2Vec2FeatureExtractor.zero_mean_unit_var_norm
+        x = (x - x.mean()) / np.sqrt(x.var() + 1e-7)
+    inputs = {'input_values': torch.from_numpy(x)[None]}
+    if processor.return_attention_mask:
+        inputs['attention_mask'] = torch.ones((1, x.shape[0]), dtype=torch.int32)
+    return inputs
+
+def predict_audio(audio, key=None):
+    """
+    Manual prediction using Wav2Vec on an already-decoded 16kHz array.
+    Pass key (see audio_digest) to reuse the result for identical uploads.
     Returns: (label_string, confidence_float)
     """
-    # 1. Load Audio (Force 16kHz for Wav2Vec)
-    audio, sr = librosa.load(filepath, sr=16000)
-    
-    # 2. Process Audio (Normalize & Extract Features)
-    inputs = processor(
-        audio, 
-        sampling_rate=16000, 
-        return_tensors="pt", 
-        padding=True, 
-        truncation=True, 
-        max_length=16000*3 # Max 3 seconds context
-    )
-    
-    # 3. Model Inference
-    with torch.no_grad():
-        logits = model(**inputs).logits
-    
-    # 4. Softmax for Probabilities
-    probs = torch.nn.functional.softmax(logits, dim=-1)
-    
-    # 5. Get Winner
-    score, id = torch.max(probs, dim=-1)
-    label = model.config.id2label[id.item()]
+    if key is not None:
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # 1. Process Audio (Normalize & Extract Features)
+    inputs = extract_features(audio)
     
-    return label, score.item()
+    # 2. Model Inference + Softmax winner, batched with concurrent requests
+    result = inference_batcher.submit(inputs)
+    if key is not None:
+        prediction_cache.put(key, result)
+    return result
+
+def predict_file(filepath):
+    """Legacy path-based wrapper around predict_audio."""
+    with open(filepath, 'rb') as f:
+        audio, _ = load_audio(f.read())
+    return predict_audio(audio)
+
+@lru_cache(maxsize=G2P_CACHE_SIZE)
+def cached_g2p(word):
+    """g2p for words missing from the prompt table, memoized across requests."""
+    return tuple(p for p in g2p(word) if p not in PH_SKIP)
+
+def build_word2phoneme():
+    """
+    Precompute phonemes for the prompt vocabulary into WORD2PHONEME.
+    Returns: number of words in the table.
+    """
+    global WORD2PHONEME
+    # Swap in the finished table so concurrent lookups never see a partial one
+    WORD2PHONEME = {word: tuple(p for p in g2p(word) if p not in PH_SKIP) for word in PROMPT_WORDS}
+    return len(WORD2PHONEME)
+
+def word_phonemes(word):
+    """ARPABET phonemes (with stress digits) for a single transcript word."""
+    word = word.lower()
+    phonemes = WORD2PHONEME.get(word)
+    if phonemes is None:
+        phonemes = cached_g2p(word)
+    return phonemes
+
+def to_pcm16(audio):
+    """Float samples in [-1, 1] -> little-endian LINEAR16 bytes for Google STT."""
+    # One temporary: clip into a fresh buffer, then scale it in place
+    scaled = np.clip(audio, -1.0, 1.0)
+    np.multiply(scaled, 32767, out=scaled)
+    return scaled.astype('<i2').tobytes()
+
+def recognize_results(pcm, duration_sec, config, single_utterance=False):
+    """
+    Pick the cheapest Google STT call for the clip length and return its final results:
+    streaming for short exercise clips, sync up to 1 min, long-running beyond that.
+    """
+    client = get_speech_client()
+    # Recognition takes time proportional to the audio, so long clips get a longer deadline
+    deadline = max(STT_TIMEOUT_SEC, duration_sec)
+    if duration_sec < STT_STREAMING_MAX_SEC:
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=config, single_utterance=single_utterance, interim_results=False
+        )
+        requests = (
+            speech.StreamingRecognizeRequest(audio_content=pcm[i:i + STT_CHUNK_BYTES])
+            for i in range(0, len(pcm), STT_CHUNK_BYTES)
+        )
+        responses = client.streaming_recognize(
+            config=streaming_config, requests=requests, timeout=deadline
+        )
+        return [result for response in responses for result in response.results if result.is_final]
+
+    audio_file = speech.RecognitionAudio(content=pcm)
+    if duration_sec <= STT_SYNC_MAX_SEC:
+        return client.recognize(config=config, audio=audio_file, timeout=deadline).results
 
-def get_google_transcript(file_path):
-    """Returns transcript and word-level timestamps."""
+    operation = client.long_running_recognize(config=config, audio=audio_file, timeout=STT_TIMEOUT_SEC)
+    return operation.result(timeout=STT_LONG_RUNNING_TIMEOUT_SEC).results
+
+def get_google_transcript(audio, single_utterance=False):
+    """
+    Returns transcript and word-level timestamps for a 16kHz mono array.
+    single_utterance lets short clips end as soon as the speaker stops.
+    """
     try:
-        client = speech.SpeechClient()
-        audio = AudioSegment.from_file(file_path)
-        audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-        wav_data = io.BytesIO()
-        audio.export(wav_data, format="wav")
-        content = wav_data.getvalue()
-        
-        audio_file = speech.RecognitionAudio(content=content)
+        pcm = to_pcm16(audio)
+        if not pcm:
+            return "", []
+
         config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
             sample_rate_hertz=16000,
@@ -137,11 +437,13 @@ def get_google_transcript(file_path):
             enable_word_time_offsets=True,
             enable_word_confidence=True,
         )
-        response = client.recognize(config=config, audio=audio_file)
+        results = recognize_results(pcm, len(audio) / SAMPLE_RATE, config, single_utterance)
         
         words = []
         full_text = ""
-        for result in response.results:
+        for result in results:
+            if not result.alternatives:
+                continue
             full_text += result.alternatives[0].transcript + " "
             for w in result.alternatives[0].words:
                 words.append({
@@ -167,12 +469,11 @@ def calculate_wpm(words_data):
     if duration <= 0: return 0
     return round((len(words_data) / duration) * 60, 1)
 
-def analyze_voicing_noise(filepath):
+def analyze_voicing_noise(y, sr):
     """
     Return heuristics for anti-blow validation (Transferred from old app).
     """
     try:
-        y, sr = librosa.load(filepath, sr=SAMPLE_RATE)
         if len(y) < int(0.3 * sr):
             return {'pitched_ratio': 0.0, 'voiced_detected': False, 'noise_suspected': True}
 
@@ -180,12 +481,9 @@ def analyze_voicing_noise(filepath):
         zcr = librosa.feature.zero_crossing_rate(y=y)[0]
         zcr_mean = float(np.mean(zcr))
 
-        # Pitch detection (pyin)
+        # Pitch detection (YIN periodicity per frame)
         try:
-            f0, _, _ = librosa.pyin(y, fmin=80, fmax=400, sr=sr)
-            voiced_frames = np.sum(~np.isnan(f0))
-            total_frames = len(f0)
-            pitched_ratio = float(voiced_frames) / float(total_frames) if total_frames > 0 else 0.0
+            pitched_ratio = float(np.mean(voiced_frames(y, sr)))
         except:
             pitched_ratio = 0.0
 
@@ -202,25 +500,59 @@ def analyze_voicing_noise(filepath):
         print(f"Voicing analysis error: {e}")
         return {'voiced_detected': False, 'noise_suspected': True}
 
-def analyze_amplitude(filepath, threshold=0.02, min_duration=1.5):
-    """Analyze sustained amplitude for Snake exercise."""
+def voiced_frames(y, sr, fmin=80, fmax=400, frame_length=1024, hop_length=512, threshold=0.4):
+    """
+    Per-frame voicing mask from the YIN cumulative-mean-normalized difference,
+    computed for all frames at once from an FFT autocorrelation. Unlike pyin there
+    is no Viterbi decode, and unlike a bare f0 range check on librosa.yin it still
+    rejects broadband noise (blowing), whose difference never dips near zero.
+    Returns: boolean array, True where a frame is periodic within [fmin, fmax].
+    """
+    y = np.pad(y, frame_length // 2)
+    frames = sliding_window_view(y, frame_length)[::hop_length]
+    lo, hi = int(sr // fmax), int(np.ceil(sr / fmin))
+    spec = np.fft.rfft(frames, n=2 * frame_length, axis=1)
+    acf = np.fft.irfft(spec.real ** 2 + spec.imag ** 2, axis=1)[:, :hi + 1]
+    diff = 2.0 * (acf[:, :1] - acf[:, 1:])
+    cmnd = diff * np.arange(1, hi + 1) / np.maximum(np.cumsum(diff, axis=1), 1e-10)
+    # Energy floor keeps digital silence (diff == 0) from reading as periodic
+    return (cmnd[:, lo - 1:].min(axis=1) < threshold) & (acf[:, 0] > frame_length * 1e-6)
+
+def frame_rms(y, frame_length=2048, hop_length=512):
+    """
+    Per-frame RMS envelope; same frames as librosa.feature.rms (centered, zero-padded)
+    without librosa's generic framing machinery.
+    """
+    y = np.pad(y, frame_length // 2)
+    frames = sliding_window_view(y, frame_length)[::hop_length]
+    return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_length)
+
+def compute_rms(y, sr):
+    """
+    Shared RMS envelope for the amplitude and breath analyzers, so a request that
+    needs both frames the audio once.
+    Returns: (rms, frame_duration) with frame_duration in seconds per frame.
+    """
+    rms = frame_rms(y)
+    return rms, len(y) / sr / len(rms)
+
+def mask_runs(mask):
+    """
+    Vectorized run-length scan over a boolean frame mask.
+    Returns: (starts, ends) index arrays of each True run (end is exclusive).
+    """
+    # Edges alternate rise/fall, so one nonzero scan yields both boundaries
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges[::2], edges[1::2]
+
+def analyze_amplitude(audio, sr, threshold=0.02, min_duration=1.5, envelope=None):
+    """Analyze sustained amplitude for Snake exercise (envelope: optional (rms, frame_duration) from compute_rms)."""
     try:
-        audio, sr = librosa.load(filepath, sr=SAMPLE_RATE)
-        audio, _ = librosa.effects.trim(audio, top_db=30) 
-        
-        rms = librosa.feature.rms(y=audio)[0]
-        frame_duration = len(audio) / sr / len(rms)
+        rms, frame_duration = envelope if envelope is not None else compute_rms(audio, sr)
         
         above_threshold = rms > threshold
-        sustained_frames = 0
-        max_sustained = 0
-        
-        for val in above_threshold:
-            if val:
-                sustained_frames += 1
-                max_sustained = max(max_sustained, sustained_frames)
-            else:
-                sustained_frames = 0
+        starts, ends = mask_runs(above_threshold)
+        max_sustained = int((ends - starts).max(initial=0))
         
         sustained_duration = max_sustained * frame_duration
         amplitude_sustained = sustained_duration >= min_duration
@@ -229,47 +561,68 @@ def analyze_amplitude(filepath, threshold=0.02, min_duration=1.5):
     except:
         return {'duration_sec': 0, 'amplitude_sustained': False}
 
-def detect_breath(filepath, silence_threshold=0.01, min_silence=0.3):
-    """Detect breath pattern for Balloon exercise."""
+def detect_breath(audio, sr, silence_threshold=0.01, min_silence=0.3, envelope=None):
+    """Detect breath pattern for Balloon exercise (envelope: optional (rms, frame_duration) from compute_rms)."""
     try:
-        audio, sr = librosa.load(filepath, sr=SAMPLE_RATE)
-        rms = librosa.feature.rms(y=audio, frame_length=2048, hop_length=512)[0]
-        frame_duration = len(audio) / sr / len(rms)
+        rms, frame_duration = envelope if envelope is not None else compute_rms(audio, sr)
         
         silence_frames = rms < silence_threshold
-        has_silence = False
-        silence_count = 0
+        starts, ends = mask_runs(silence_frames)
         
-        for i, is_silent in enumerate(silence_frames):
-            if is_silent:
-                silence_count += 1
-            elif silence_count > 0:
-                silence_duration = silence_count * frame_duration
-                if silence_duration >= min_silence:
-                    has_silence = True
-                    if i < len(rms):
-                        return {'breath_detected': True, 'amplitude_onset': round(float(rms[i]), 3)}
-                silence_count = 0
-        return {'breath_detected': has_silence, 'amplitude_onset': 0.0}
+        # A breath is a long-enough silence that is followed by voice again;
+        # the frame right after the run gives the onset amplitude.
+        breaths = ends[((ends - starts) * frame_duration >= min_silence) & (ends < len(rms))]
+        if breaths.size:
+            return {'breath_detected': True, 'amplitude_onset': round(float(rms[breaths[0]]), 3)}
+        return {'breath_detected': False, 'amplitude_onset': 0.0}
     except:
         return {'breath_detected': False, 'amplitude_onset': 0.0}
 
+HIT_MSGS = {
+    'turtle': ("Great! You spoke slowly and fluently.", "Awesome slow speech!"),
+    'snake': ("Smooth prolongation! The snake loved that.", "Excellent sustained sound!"),
+    'balloon': ("Perfect easy onset!", "Great gentle start!"),
+    'onetap': ("Fluent one-tap! Nailed it.", "Awesome! No bumps!")
+}
+DEFAULT_HIT_MSGS = ("Great job!",)
+MISS_MSGS = {
+    'turtle': "Try to keep it smooth and steady!",
+    'snake': "Try to make it one smooth sound.",
+    'balloon': "Remember: gentle breath, then soft start.",
+    'onetap': "Almost! Try to make it smoother."
+}
+
 def get_feedback(exercise_type, is_hit, stutter_type=None):
-    hit_msgs = {
-        'turtle': ["Great! You spoke slowly and fluently.", "Awesome slow speech!"],
-        'snake': ["Smooth prolongation! The snake loved that.", "Excellent sustained sound!"],
-        'balloon': ["Perfect easy onset!", "Great gentle start!"],
-        'onetap': ["Fluent one-tap! Nailed it.", "Awesome! No bumps!"]
-    }
-    miss_msgs = {
-        'turtle': "Try to keep it smooth and steady!",
-        'snake': "Try to make it one smooth sound.",
-        'balloon': "Remember: gentle breath, then soft start.",
-        'onetap': "Almost! Try to make it smoother."
-    }
-    import random
-    if is_hit: return random.choice(hit_msgs.get(exercise_type, ["Great job!"]))
-    return miss_msgs.get(exercise_type, "Give it another try!")
+    if is_hit: return random.choice(HIT_MSGS.get(exercise_type, DEFAULT_HIT_MSGS))
+    return MISS_MSGS.get(exercise_type, "Give it another try!")
+
+
+# --- WARM-UP ---
+def warm_up():
+    """
+    Push one synthetic 3s clip through the request path at startup so the first
+    real user doesn't pay for torch kernel setup, librosa/numba JIT or NLTK loading.
+    """
+    t0 = time.time()
+    dummy = (0.1 * np.random.default_rng(0).standard_normal(3 * SAMPLE_RATE)).astype(np.float32)
+    predict_audio(dummy)
+    analyze_voicing_noise(dummy, SAMPLE_RATE)
+    envelope = compute_rms(dummy, SAMPLE_RATE)
+    analyze_amplitude(dummy, SAMPLE_RATE, envelope=envelope)
+    detect_breath(dummy, SAMPLE_RATE, envelope=envelope)
+    words = build_word2phoneme()
+    warm_ready.set()
+    print(f"🔥 Warm-up done in {int((time.time() - t0) * 1000)} ms ({words} prompt words precomputed)")
+
+def start_warm_up():
+    """Run warm_up off the import path so the server accepts requests immediately."""
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+warm_ready = threading.Event()
+# Under gunicorn --preload this module is imported in the master before forking;
+# threads don't survive fork, so each worker starts its own (see gunicorn.conf.py)
+if os.environ.get('DEFER_WARM_UP') != '1':
+    start_warm_up()
 
 
 # --- MAIN ENDPOINT: GENERAL ANALYSIS ---
@@ -277,52 +630,52 @@ def get_feedback(exercise_type, is_hit, stutter_type=None):
 def analyze_audio():
     if 'file' not in request.files: return jsonify({'error': 'No file'}), 400
     file = request.files['file']
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(os.getcwd(), filename)
-    file.save(filepath)
+    data = file.read()
 
-    try:
-        # 1. RUN WAV2VEC PREDICTION
-        label, confidence = predict_file(filepath)
-        
-        # Logic: If label contains "fluent", it's fluent. Else it's a stutter.
-        # Note: Your model labels are likely "0_fluent", "1_block", etc.
-        is_stutter = "fluent" not in label.lower()
-        stutter_type = "Fluent"
+    audio, sr = load_audio(data)
+    if is_silent(audio):
+        # Nothing was said: no stutter to classify and nothing to transcribe
+        return jsonify({'is_stutter': False, 'stutter_score': 0.0, 'type': 'Fluent',
+                        'problem_phoneme': None, 'transcript': '', 'model_skipped': True})
+    stt_future = analysis_pool.submit(get_google_transcript, audio)
+
+    # 1. RUN WAV2VEC PREDICTION
+    label, confidence = predict_audio(audio, key=audio_digest(data))
+    
+    # Logic: If label contains "fluent", it's fluent. Else it's a stutter.
+    # Note: Your model labels are likely "0_fluent", "1_block", etc.
+    is_stutter = "fluent" not in label.lower()
+    stutter_type = "Fluent"
+    
+    if is_stutter:
+        if "_" in label:
+            stutter_type = label.split('_')[1].capitalize()
+        else:
+            stutter_type = label.capitalize()
+
+    # 2. GET TRANSCRIPT (for phonemes)
+    full_text, words = stt_future.result()
+    final_phoneme = None
+
+    if is_stutter and words:
+        # Find the word with lowest confidence (often the stuttered one)
+        confs = np.fromiter((w['confidence'] for w in words), dtype=np.float64, count=len(words))
+        culprit = words[int(confs.argmin())]
         
-        if is_stutter:
-            if "_" in label:
-                stutter_type = label.split('_')[1].capitalize()
-            else:
-                stutter_type = label.capitalize()
-
-        # 2. GET TRANSCRIPT (for phonemes)
-        full_text, words = get_google_transcript(filepath)
-        final_phoneme = None
-
-        if is_stutter and words:
-            # Find the word with lowest confidence (often the stuttered one)
-            culprit = min(words, key=lambda w: w['confidence'])
-            
-            phonemes = g2p(culprit['word'])
-            clean = [p for p in phonemes if p not in [" ", "'"]]
-            if clean:
-                raw = ''.join([i for i in clean[0] if not i.isdigit()])
-                final_phoneme = PHONEME_MAP.get(raw, raw.lower())
-
-        response = {
-            'is_stutter': is_stutter,
-            'stutter_score': confidence,
-            'type': stutter_type,
-            'problem_phoneme': final_phoneme,
-            'transcript': full_text,
-        }
-        return jsonify(response)
+        clean = word_phonemes(culprit['word'])
+        if clean:
+            final_phoneme = ARPABET_MAP.get(clean[0], clean[0].lower())
+
+    response = {
+        'is_stutter': is_stutter,
+        'stutter_score': confidence,
+        'type': stutter_type,
+        'problem_phoneme': final_phoneme,
+        'transcript': full_text,
+        'model_skipped': False,
+    }
+    return jsonify(response)
 
-    finally:
-        if os.path.exists(filepath):
-            try: os.remove(filepath)
-            except: pass
 
 
 # --- EXERCISE ENDPOINTS (Fully Restored Logic) ---
@@ -331,39 +684,39 @@ def analyze_audio():
 def analyze_turtle():
     if 'file' not in request.files: return jsonify({'error': 'No file'}), 400
     file = request.files['file']
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(os.getcwd(), filename)
-    file.save(filepath)
-
-    try:
-        t0 = time.time()
+    data = file.read()
+
+    t0 = time.time()
+    audio, sr = load_audio(data)
+    model_skipped = is_silent(audio)
+    if model_skipped:
+        # Silence fails the WPM gate on its own; skip STT and the model
+        wpm, score, is_stutter, block_detected = 0, 0.0, False, False
+    else:
+        stt_future = analysis_pool.submit(get_google_transcript, audio)
         
         # 1. AI Check (Wav2Vec)
-        label, score = predict_file(filepath)
+        label, score = predict_audio(audio, key=audio_digest(data))
         
         is_stutter = "fluent" not in label.lower()
         block_detected = "block" in label.lower()
         
         # 2. WPM Check
-        text, words = get_google_transcript(filepath)
+        text, words = stt_future.result()
         wpm = calculate_wpm(words) if words else 0
-        
-        game_pass = wpm < 120 and wpm > 0
-        clinical_pass = not block_detected
-        is_hit = game_pass and clinical_pass
-        
-        elapsed_ms = int((time.time() - t0) * 1000)
-        return jsonify({
-            'wpm': wpm, 'game_pass': game_pass,
-            'stutter_detected': is_stutter, 'block_detected': block_detected,
-            'clinical_pass': clinical_pass, 'confidence': score,
-            'feedback': get_feedback('turtle', is_hit, 'Block' if block_detected else None),
-            'elapsed_ms': elapsed_ms
-        })
-    finally:
-        if os.path.exists(filepath): 
-            try: os.remove(filepath)
-            except: pass
+    
+    game_pass = wpm < 120 and wpm > 0
+    clinical_pass = not block_detected
+    is_hit = game_pass and clinical_pass
+    
+    elapsed_ms = int((time.time() - t0) * 1000)
+    return jsonify({
+        'wpm': wpm, 'game_pass': game_pass,
+        'stutter_detected': is_stutter, 'block_detected': block_detected,
+        'clinical_pass': clinical_pass, 'model_skipped': model_skipped, 'confidence': score,
+        'feedback': get_feedback('turtle', is_hit, 'Block' if block_detected else None),
+        'elapsed_ms': elapsed_ms
+    })
 
 @app.route('/analyze/snake', methods=['POST'])
 def analyze_snake():
@@ -383,194 +736,192 @@ def analyze_snake():
     # Retrieve Game Data
     target_phoneme = request.form.get('targetPhoneme') or request.form.get('prompt_phoneme')
     
-    filepath = os.path.join(os.getcwd(), filename)
-    file.save(filepath)
-
-    try:
-        t0 = time.time()
-        
-        # 1. AI Check (Wav2Vec)
-        label, score = predict_file(filepath)
+    data = file.read()
+
+    t0 = time.time()
+    audio, sr = load_audio(data)
+    # Silence can't be voiced or transcribed: skip both and take their empty results
+    silent = is_silent(audio)
+    stt_future = analysis_pool.submit(get_google_transcript, audio, single_utterance=True) if target_phoneme and not silent else None
+    voicing_future = None if silent else analysis_pool.submit(analyze_voicing_noise, audio, sr)
+    
+    # 1. Amplitude Check
+    amp_data = analyze_amplitude(audio, sr)
+    game_pass = amp_data['amplitude_sustained']
+    
+    # 2. AI Check (Wav2Vec) - only worth running once the game gate passed.
+    # Skipped attempts are flagged model_skipped so the client doesn't log the
+    # placeholder clinical fields as an assessment.
+    model_skipped = not game_pass
+    if model_skipped:
+        score, repetition_detected = 0.0, False
+    else:
+        label, score = predict_audio(audio, key=audio_digest(data))
         repetition_detected = "repetition" in label.lower()
-        
-        # 2. Amplitude Check
-        amp_data = analyze_amplitude(filepath)
-        game_pass = amp_data['amplitude_sustained']
-        clinical_pass = not repetition_detected
-        
-        # 3. Voicing / Anti-Blow Logic
-        voicing = analyze_voicing_noise(filepath)
-        
-        # 4. Phoneme Validation (Google STT)
-        phoneme_match = None
-        if target_phoneme:
-            try:
-                full_text, words = get_google_transcript(filepath)
-                if words:
-                    target = target_phoneme.strip().lower()
-                    found = False
-                    for w in words:
-                        try:
-                            phonemes = g2p(w['word'])
-                            clean = [p for p in phonemes if p not in [" ", "'"]]
-                            for p in clean:
-                                raw = ''.join([i for i in p if not i.isdigit()])
-                                mapped = PHONEME_MAP.get(raw, raw.lower())
-                                if mapped.lower() == target:
-                                    found = True
-                                    break
-                            if found: break
-                        except Exception:
-                            pass
-                    phoneme_match = found
+    clinical_pass = not repetition_detected
+    
+    # 3. Voicing / Anti-Blow Logic
+    voicing = voicing_future.result() if voicing_future else {'pitched_ratio': 0.0, 'voiced_detected': False, 'noise_suspected': True}
+    
+    # 4. Phoneme Validation (Google STT)
+    phoneme_match = None
+    if target_phoneme:
+        try:
+            full_text, words = stt_future.result() if stt_future else ("", [])
+            if words:
+                # Map the target once; each word is then one set intersection test
+                target_tokens = KID_TO_ARPABET.get(target_phoneme.strip().lower(), frozenset())
+                found = False
+                for w in words:
+                    try:
+                        if not target_tokens.isdisjoint(word_phonemes(w['word'])):
+                            found = True
+                            break
+                    except Exception:
+                        pass
+                phoneme_match = found
+            else:
+                # STT detected no words - trust voicing detection instead
+                # If user was voicing, don't fail them for STT's inability to transcribe
+                if voicing['voiced_detected']:
+                    phoneme_match = None  # Ignore phoneme match when STT fails but voicing detected
                 else:
-                    # STT detected no words - trust voicing detection instead
-                    # If user was voicing, don't fail them for STT's inability to transcribe
-                    if voicing['voiced_detected']:
-                        phoneme_match = None  # Ignore phoneme match when STT fails but voicing detected
-                    else:
-                        phoneme_match = False  # Silence/Hum usually means no word found
-            except Exception:
-                phoneme_match = None # STT error, ignore
-
-        # 5. Apply Anti-Blow Rule (only override if we have strong evidence of no speech)
-        if target_phoneme:
-            voiced_targets = {'a','e','i','o','u','oo','ee','er','m','n','l','r','w','y','ng','v','z','j'}
-            is_voiced_target = (target_phoneme.strip().lower() in voiced_targets)
-            if is_voiced_target:
-                # Only fail if BOTH voicing AND STT failed (strong evidence of blow/noise)
-                # If either passed, give benefit of doubt
-                speech_likely = voicing['voiced_detected'] or score > 0.6 or (phoneme_match is True)
-                if not speech_likely and phoneme_match is False:
-                    # Only override to False if we already had a phoneme mismatch from STT
-                    pass  # Keep phoneme_match as False
-                elif not speech_likely and phoneme_match is None:
-                    # STT didn't detect anything but voicing also failed - likely blow/noise
-                    phoneme_match = False
-
-        is_hit = game_pass and clinical_pass
-        is_stutter = repetition_detected or not game_pass
-        stutter_type = 'Fluent'
-        if repetition_detected: stutter_type = 'Repetition'
-        elif not game_pass: stutter_type = 'Block'
-
-        stars_awarded = 1 if stutter_type in ['Repetition', 'Block'] else 3
-        session_id = request.form.get('sessionId') or str(uuid.uuid4())
-        inference_ms = int((time.time() - t0) * 1000)
-
-        # Calculate overall confidence (0.0-1.0) for progression
-        # Factors: game pass (40%), clinical pass (30%), phoneme match (20%), voicing (10%)
-        confidence_score = 0.0
-        if game_pass:
-            confidence_score += 0.4
-        if clinical_pass:
-            confidence_score += 0.3
-        if phoneme_match is True:
-            confidence_score += 0.2
-        elif phoneme_match is None:  # STT error or no target - don't penalize
-            confidence_score += 0.15
-        if voicing['voiced_detected']:
-            confidence_score += 0.1
-
-        response_payload = {
-            'sessionId': session_id,
-            'isStutter': is_stutter,
-            'stutterType': stutter_type,
-            'confidence': confidence_score,  # Overall performance confidence for progression
-            # Back-compat for client VoiceIndicator: use model confidence as speech_prob proxy
-            'speech_prob': float(score),
-            'starsAwarded': stars_awarded,
-            'feedback': get_feedback('snake', is_hit, 'Repetition' if repetition_detected else None),
-            'inferenceTimeMs': inference_ms,
-            'duration_sec': amp_data['duration_sec'],
-            'amplitude_sustained': amp_data['amplitude_sustained'],
-            'game_pass': game_pass,
-            'repetition_detected': repetition_detected,
-            'clinical_pass': clinical_pass,
-            'phoneme_match': phoneme_match,
-            'voiced_detected': voicing['voiced_detected'],
-            'progressionConfidence': PROGRESSION_CONFIDENCE,
-        }
-        return jsonify(response_payload)
-    finally:
-        if os.path.exists(filepath): 
-            try: os.remove(filepath)
-            except: pass
+                    phoneme_match = False  # Silence/Hum usually means no word found
+        except Exception:
+            phoneme_match = None # STT error, ignore
+
+    # 5. Apply Anti-Blow Rule (only override if we have strong evidence of no speech)
+    if target_phoneme:
+        voiced_targets = {'a','e','i','o','u','oo','ee','er','m','n','l','r','w','y','ng','v','z','j'}
+        is_voiced_target = (target_phoneme.strip().lower() in voiced_targets)
+        if is_voiced_target:
+            # Only fail if BOTH voicing AND STT failed (strong evidence of blow/noise)
+            # If either passed, give benefit of doubt
+            speech_likely = voicing['voiced_detected'] or score > 0.6 or (phoneme_match is True)
+            if not speech_likely and phoneme_match is False:
+                # Only override to False if we already had a phoneme mismatch from STT
+                pass  # Keep phoneme_match as False
+            elif not speech_likely and phoneme_match is None:
+                # STT didn't detect anything but voicing also failed - likely blow/noise
+                phoneme_match = False
+
+    is_hit = game_pass and clinical_pass
+    is_stutter = repetition_detected or not game_pass
+    stutter_type = 'Fluent'
+    if repetition_detected: stutter_type = 'Repetition'
+    elif not game_pass: stutter_type = 'Block'
+
+    stars_awarded = 1 if stutter_type in ['Repetition', 'Block'] else 3
+    session_id = request.form.get('sessionId') or str(uuid.uuid4())
+    inference_ms = int((time.time() - t0) * 1000)
+
+    # Calculate overall confidence (0.0-1.0) for progression
+    # Factors: game pass (40%), clinical pass (30%), phoneme match (20%), voicing (10%)
+    confidence_score = 0.0
+    if game_pass:
+        confidence_score += 0.4
+    if clinical_pass:
+        confidence_score += 0.3
+    if phoneme_match is True:
+        confidence_score += 0.2
+    elif phoneme_match is None:  # STT error or no target - don't penalize
+        confidence_score += 0.15
+    if voicing['voiced_detected']:
+        confidence_score += 0.1
+
+    response_payload = {
+        'sessionId': session_id,
+        'isStutter': is_stutter,
+        'stutterType': stutter_type,
+        'confidence': confidence_score,  # Overall performance confidence for progression
+        # Back-compat for client VoiceIndicator: use model confidence as speech_prob proxy
+        'speech_prob': float(score),
+        'starsAwarded': stars_awarded,
+        'feedback': get_feedback('snake', is_hit, 'Repetition' if repetition_detected else None),
+        'inferenceTimeMs': inference_ms,
+        'duration_sec': amp_data['duration_sec'],
+        'amplitude_sustained': amp_data['amplitude_sustained'],
+        'game_pass': game_pass,
+        'repetition_detected': repetition_detected,
+        'clinical_pass': clinical_pass,
+        'model_skipped': model_skipped,
+        'phoneme_match': phoneme_match,
+        'voiced_detected': voicing['voiced_detected'],
+        'progressionConfidence': PROGRESSION_CONFIDENCE,
+    }
+    return jsonify(response_payload)
 
 @app.route('/analyze/balloon', methods=['POST'])
 def analyze_balloon():
     if 'file' not in request.files: return jsonify({'error': 'No file'}), 400
     file = request.files['file']
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(os.getcwd(), filename)
-    file.save(filepath)
+    data = file.read()
 
-    try:
-        t0 = time.time()
-        
-        # 1. AI Check (Wav2Vec)
-        label, score = predict_file(filepath)
-        
+    t0 = time.time()
+    audio, sr = load_audio(data)
+    
+    # 1. Breath Check (Restored Logic)
+    breath_data = detect_breath(audio, sr)
+    game_pass = breath_data['breath_detected']
+    
+    # 2. AI Check (Wav2Vec) - only worth running once the game gate passed
+    model_skipped = not game_pass
+    if model_skipped:
+        score, hard_attack = 0.0, False
+    else:
+        label, score = predict_audio(audio, key=audio_digest(data))
         # Hard attack often sounds like a block or a very high confidence stutter start
         hard_attack = "block" in label.lower() or (score > 0.9 and "fluent" not in label.lower())
-        
-        # 2. Breath Check (Restored Logic)
-        breath_data = detect_breath(filepath)
-        game_pass = breath_data['breath_detected']
-        
-        clinical_pass = not hard_attack
-        is_hit = game_pass and clinical_pass
-        
-        return jsonify({
-            'breath_detected': breath_data['breath_detected'], 
-            'amplitude_onset': breath_data['amplitude_onset'],
-            'game_pass': game_pass, 
-            'hard_attack_detected': hard_attack,
-            'clinical_pass': clinical_pass, 
-            'confidence': score,
-            'feedback': get_feedback('balloon', is_hit, 'Block' if hard_attack else None),
-            'elapsed_ms': int((time.time() - t0) * 1000)
-        })
-    finally:
-        if os.path.exists(filepath): 
-            try: os.remove(filepath)
-            except: pass
+    
+    clinical_pass = not hard_attack
+    is_hit = game_pass and clinical_pass
+    
+    return jsonify({
+        'breath_detected': breath_data['breath_detected'], 
+        'amplitude_onset': breath_data['amplitude_onset'],
+        'game_pass': game_pass, 
+        'hard_attack_detected': hard_attack,
+        'clinical_pass': clinical_pass, 
+        'model_skipped': model_skipped,
+        'confidence': score,
+        'feedback': get_feedback('balloon', is_hit, 'Block' if hard_attack else None),
+        'elapsed_ms': int((time.time() - t0) * 1000)
+    })
 
 @app.route('/analyze/onetap', methods=['POST'])
 def analyze_onetap():
     if 'file' not in request.files: return jsonify({'error': 'No file'}), 400
     file = request.files['file']
-    filename = secure_filename(file.filename)
-    filepath = os.path.join(os.getcwd(), filename)
-    file.save(filepath)
+    data = file.read()
 
-    try:
-        t0 = time.time()
-        
-        # Simple AI Check
-        label, score = predict_file(filepath)
-        
+    t0 = time.time()
+    audio, sr = load_audio(data)
+    
+    # Simple AI Check - silence is a miss, not a fluent tap
+    model_skipped = is_silent(audio)
+    if model_skipped:
+        score, is_stutter, clinical_pass = 0.0, False, False
+    else:
+        label, score = predict_audio(audio, key=audio_digest(data))
         is_stutter = "fluent" not in label.lower()
         clinical_pass = not is_stutter
-        
-        return jsonify({
-            'stutter_detected': is_stutter,
-            'repetition_detected': is_stutter, # Legacy field support
-            'clinical_pass': clinical_pass,
-            'confidence': score,
-            'feedback': get_feedback('onetap', clinical_pass, 'Stutter' if is_stutter else None),
-            'elapsed_ms': int((time.time() - t0) * 1000)
-        })
-    finally:
-        if os.path.exists(filepath): 
-            try: os.remove(filepath)
-            except: pass
+    
+    return jsonify({
+        'stutter_detected': is_stutter,
+        'repetition_detected': is_stutter, # Legacy field support
+        'clinical_pass': clinical_pass,
+        'model_skipped': model_skipped,
+        'confidence': score,
+        'feedback': get_feedback('onetap', clinical_pass, 'Stutter' if is_stutter else None),
+        'elapsed_ms': int((time.time() - t0) * 1000)
+    })
 
 # --- HEALTH CHECK ---
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok', 'model': 'Wav2Vec 2.0'}), 200
+    return jsonify({'status': 'ok', 'model': 'Wav2Vec 2.0', 'warm': warm_ready.is_set()}), 200
 
 if __name__ == '__main__':
+    # Local development only; production runs under gunicorn (see gunicorn.conf.py)
     # Debug=False prevents reloading large models twice
-    app.run(host='0.0.0.0', port=PORT, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, debug=False, threaded=True)
\ No newline at end of file
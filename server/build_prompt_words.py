@@ -0,0 +1,64 @@
+"""
+Regenerate server/prompt_words.txt from the app's prompt vocabulary.
+
+Collects every word of the practice sentences and the content bank seed
+(the `text:` strings in the TypeScript sources) into a sorted plain list that
+ships with the server; app.py runs g2p over it at warm-up. Rerun whenever
+those files change, and run with --check in CI to fail on a stale list.
+
+Run from the repo root:  python server/build_prompt_words.py [--check]
+"""
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = [
+    os.path.join(ROOT, 'constants', 'sentences.ts'),
+    os.path.join(ROOT, 'scripts', 'seed-content-bank.ts'),
+]
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompt_words.txt')
+HEADER = '# Generated by build_prompt_words.py from constants/sentences.ts and scripts/seed-content-bank.ts. Do not edit.\n'
+
+# A quoted string literal after a `text:` key; backslash escapes stay inside the match
+TEXT_FIELD = re.compile(r"""\btext:\s*(['"])((?:\\.|(?!\1)[^\\])*)\1""")
+ESCAPE = re.compile(r'\\(.)')
+WORD = re.compile(r"[a-z']+")
+
+
+def collect_words(paths):
+    words = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for _, literal in TEXT_FIELD.findall(f.read()):
+                text = ESCAPE.sub(r'\1', literal)
+                words.update(w.strip("'") for w in WORD.findall(text.lower()))
+    words.discard('')
+    return sorted(words)
+
+
+def render(words):
+    return HEADER + ''.join(f'{w}\n' for w in words)
+
+
+def main():
+    content = render(collect_words(SOURCES))
+    if '--check' in sys.argv[1:]:
+        try:
+            with open(OUTPUT_PATH, encoding='utf-8') as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != content:
+            print(f"❌ {OUTPUT_PATH} is stale; rerun python server/build_prompt_words.py")
+            sys.exit(1)
+        print(f"✅ {OUTPUT_PATH} is up to date")
+        return
+
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        f.write(content)
+    print(f"✅ Wrote {content.count(chr(10)) - 1} words to {OUTPUT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Gunicorn settings for the analysis server (picked up automatically from cwd).
+Run from server/:  gunicorn app:app
+
+Set WEB_WORKERS explicitly in deployment. Each worker holds its own
+activations, NLTK tagger and analysis pool, so size it to the instance's
+memory as well as its CPUs. Without it the default is one worker per
+usable physical core (CPU affinity and cgroup quota respected, SMT siblings
+counted once), capped at MAX_DEFAULT_WORKERS.
+"""
+import math
+import os
+import sys
+
+MAX_DEFAULT_WORKERS = 4
+
+
+def usable_physical_cores():
+    """CPUs this process may actually run on, minus SMT siblings and cgroup quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    try:
+        with open('/sys/devices/system/cpu/smt/active') as f:
+            if f.read().strip() == '1':
+                cpus //= 2
+    except OSError:
+        pass
+    try:
+        # cgroup v2, e.g. "200000 100000" -> 2 CPUs ("max" means unlimited)
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# One torch/BLAS thread per worker (app.py pins torch too); must be set
+# before the app imports torch
+for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(var, os.environ.get('TORCH_NUM_THREADS', '1'))
+
+# Import (and the Wav2Vec load) happens once in the master; forked workers
+# share the weights copy-on-write instead of each loading their own copy.
+# CUDA can't be used across fork, so GPU deployments load per worker instead.
+preload_app = not os.environ.get('TORCH_DEVICE', 'cpu').startswith('cuda')
+
+# A worker per physical core, each running single-threaded torch. Threads
+# overlap the GIL-free parts of each request (torch, librosa, Google STT gRPC)
+# and let each worker's inference batcher see concurrency.
+workers = int(os.environ.get('WEB_WORKERS', min(usable_physical_cores(), MAX_DEFAULT_WORKERS)))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '2'))
+
+# Model loading happens at import, so give workers time to boot
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+
+# Keep the master free of torch/batcher threads before it forks
+os.environ['DEFER_WARM_UP'] = '1'
+
+
+def post_worker_init(worker):
+    # Resolve the module gunicorn actually loaded (app or server.app, depending
+    # on the cwd) instead of importing by name, which can hit the Expo app/ dir
+    sys.modules[worker.wsgi.import_name].start_warm_up()
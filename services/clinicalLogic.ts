@@ -4,6 +4,7 @@ export type TurtleResponse = {
   stutter_detected: boolean;
   block_detected: boolean;
   clinical_pass: boolean;
+  model_skipped?: boolean; // true for silent clips the stutter model never ran on
   confidence: number;
   feedback: string;
 };
@@ -14,6 +15,7 @@ export type SnakeResponse = {
   game_pass: boolean;
   repetition_detected: boolean;
   clinical_pass: boolean;
+  model_skipped?: boolean; // true when the game gate failed and the stutter model never ran
   confidence: number;
   feedback: string;
   phoneme_match?: boolean; // optional backend field indicating match to prompted phoneme
@@ -32,6 +34,7 @@ export type BalloonResponse = {
   game_pass: boolean;
   hard_attack_detected: boolean;
   clinical_pass: boolean;
+  model_skipped?: boolean; // true when the game gate failed and the stutter model never ran
   confidence: number;
   feedback: string;
 };
@@ -40,6 +43,7 @@ export type OneTapResponse = {
   repetition_detected: boolean;
   repetition_prob: number;
   clinical_pass: boolean;
+  model_skipped?: boolean; // true for silent clips the stutter model never ran on
   confidence: number;
   feedback: string;
 };
@@ -47,35 +51,42 @@ export type OneTapResponse = {
 export type UnifiedResult = {
   game_pass: boolean;
   clinical_pass: boolean;
+  // Model never ran, so clinical_pass is a placeholder rather than an assessment
+  model_skipped?: boolean;
   feedback: string;
   confidence: number;
   metrics: Record<string, number | boolean>;
 };
 
 export function normalizeTurtle(res: TurtleResponse): UnifiedResult {
+  const modelSkipped = res.model_skipped === true;
   return {
     game_pass: res.game_pass,
     clinical_pass: res.clinical_pass,
+    model_skipped: modelSkipped,
     feedback: res.feedback,
     confidence: res.confidence,
     metrics: {
       wpm: res.wpm,
-      stutter_detected: res.stutter_detected,
-      block_detected: res.block_detected,
+      model_skipped: modelSkipped,
+      ...(modelSkipped ? {} : { stutter_detected: res.stutter_detected, block_detected: res.block_detected }),
     },
   };
 }
 
 export function normalizeSnake(res: SnakeResponse): UnifiedResult {
+  const modelSkipped = res.model_skipped === true;
   return {
     game_pass: res.game_pass,
     clinical_pass: res.clinical_pass,
+    model_skipped: modelSkipped,
     feedback: res.feedback,
     confidence: res.confidence,
     metrics: {
       duration_sec: res.duration_sec,
       amplitude_sustained: res.amplitude_sustained,
-      repetition_detected: res.repetition_detected,
+      model_skipped: modelSkipped,
+      ...(modelSkipped ? {} : { repetition_detected: res.repetition_detected }),
       ...(typeof res.phoneme_match === 'boolean' ? { phoneme_match: res.phoneme_match } : {}),
       ...(typeof res.voiced_detected === 'boolean' ? { voiced_detected: res.voiced_detected } : {}),
       ...(typeof res.noise_suspected === 'boolean' ? { noise_suspected: res.noise_suspected } : {}),
@@ -89,28 +100,33 @@ export function normalizeSnake(res: SnakeResponse): UnifiedResult {
 }
 
 export function normalizeBalloon(res: BalloonResponse): UnifiedResult {
+  const modelSkipped = res.model_skipped === true;
   return {
     game_pass: res.game_pass,
     clinical_pass: res.clinical_pass,
+    model_skipped: modelSkipped,
     feedback: res.feedback,
     confidence: res.confidence,
     metrics: {
       breath_detected: res.breath_detected,
       amplitude_onset: res.amplitude_onset,
-      hard_attack_detected: res.hard_attack_detected,
+      model_skipped: modelSkipped,
+      ...(modelSkipped ? {} : { hard_attack_detected: res.hard_attack_detected }),
     },
   };
 }
 
 export function normalizeOneTap(res: OneTapResponse): UnifiedResult {
+  const modelSkipped = res.model_skipped === true;
   return {
     game_pass: true, // AI-only; no game logic
     clinical_pass: res.clinical_pass,
+    model_skipped: modelSkipped,
     feedback: res.feedback,
     confidence: res.confidence,
     metrics: {
-      repetition_detected: res.repetition_detected,
-      repetition_prob: res.repetition_prob,
+      model_skipped: modelSkipped,
+      ...(modelSkipped ? {} : { repetition_detected: res.repetition_detected, repetition_prob: res.repetition_prob }),
     },
   };
 }
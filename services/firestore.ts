@@ -45,7 +45,8 @@ export type ExerciseAttemptPayload = {
   uid: string;
   exerciseType: 'turtle' | 'snake' | 'balloon' | 'onetap';
   gamePass: boolean;
-  clinicalPass: boolean;
+  // null = unassessed: the game gate failed, so the stutter model never ran
+  clinicalPass: boolean | null;
   confidence: number;
   feedback: string;
   metrics: Record<string, number | boolean>;
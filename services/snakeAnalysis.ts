@@ -129,7 +129,7 @@ export async function analyzeSnakeAudio(
             uid: auth.currentUser.uid,
             exerciseType: 'snake',
             gamePass: unified.game_pass,
-            clinicalPass: unified.clinical_pass,
+            clinicalPass: unified.model_skipped ? null : unified.clinical_pass,
             confidence: unified.confidence,
             feedback: unified.feedback,
             metrics: {